@@ -1,55 +1,130 @@
-import configparser
-from celery import Celery
-import asyncio
-from email.message import EmailMessage
-import aiosmtplib
-
-# Load config
-config = configparser.ConfigParser()
-config.read('config.ini')
-
-smtp_host = config.get('email', 'smtp_host')
-smtp_port = config.getint('email', 'smtp_port')
-smtp_user = config.get('email', 'smtp_user')
-smtp_password = config.get('email', 'smtp_password')
-sender = config.get('email', 'sender')
-recipients = [r.strip() for r in config.get('email', 'recipients').split(',')]
-use_tls = config.getboolean('email', 'use_tls', fallback=True)
-
-# Celery app
-app = Celery('alerts', broker='redis://localhost:6379/0')
-
-@app.task
-def send_alert_email(subject, body):
-    import logging
-    try:
-        logging.info(f"Attempting to send alert email: {subject}")
-        async def _send():
-            message = EmailMessage()
-            message["From"] = sender
-            message["To"] = ', '.join(recipients)
-            message["Subject"] = subject
-            message.set_content(body)
-
-            await aiosmtplib.send(
-                message,
-                hostname=smtp_host,
-                port=smtp_port,
-                username=smtp_user,
-                password=smtp_password,
-                use_tls=use_tls
-            )
-
-        # Use a fresh event loop if none exists, else run in current loop
-        try:
-            loop = asyncio.get_running_loop()
-        except RuntimeError:
-            loop = None
-        if loop and loop.is_running():
-            # Schedule coroutine in running loop
-            task = loop.create_task(_send())
-        else:
-            asyncio.run(_send())
-        logging.info("Alert email sent successfully.")
-    except Exception as e:
-        logging.error(f"Failed to send alert email: {e}", exc_info=True)
\ No newline at end of file
+import configparser
+import copy
+import logging
+import os
+import smtplib
+from dataclasses import dataclass
+from functools import lru_cache
+from celery import Celery
+from celery.signals import worker_process_init
+from email.message import EmailMessage
+
+CONFIG_PATH = 'config.ini'
+
+
+@dataclass(frozen=True)
+class SmtpConfig:
+    """Immutable SMTP settings parsed from config.ini."""
+    host: str
+    port: int
+    user: str
+    password: str
+    sender: str
+    recipients: tuple
+    use_tls: bool
+
+
+_config_mtime_ns = None
+
+
+@lru_cache(maxsize=1)
+def _load_smtp_config() -> SmtpConfig:
+    config = configparser.ConfigParser()
+    config.read(CONFIG_PATH)
+    return SmtpConfig(
+        host=config.get('email', 'smtp_host'),
+        port=config.getint('email', 'smtp_port'),
+        user=config.get('email', 'smtp_user'),
+        password=config.get('email', 'smtp_password'),
+        sender=config.get('email', 'sender'),
+        recipients=tuple(r.strip() for r in config.get('email', 'recipients').split(',')),
+        use_tls=config.getboolean('email', 'use_tls', fallback=True),
+    )
+
+
+def get_smtp_config() -> SmtpConfig:
+    """Return cached SMTP settings, re-parsing config.ini only when it changes on disk."""
+    global _config_mtime_ns
+    try:
+        mtime_ns = os.stat(CONFIG_PATH).st_mtime_ns
+    except OSError:
+        mtime_ns = None
+    if mtime_ns != _config_mtime_ns:
+        _load_smtp_config.cache_clear()
+        _config_mtime_ns = mtime_ns
+    return _load_smtp_config()
+
+
+@lru_cache(maxsize=1)
+def _message_template(cfg: SmtpConfig) -> EmailMessage:
+    """Return a template message with the From/To headers already parsed.
+
+    Building these headers re-parses the recipient list on every call;
+    memoizing the template per config means each send only copies it and
+    fills in Subject and body.
+    """
+    template = EmailMessage()
+    template["From"] = cfg.sender
+    template["To"] = ', '.join(cfg.recipients)
+    return template
+
+
+# Persistent SMTP connection, shared across tasks within one worker process.
+# Celery prefork workers have no event loop, so the client is a plain
+# synchronous smtplib.SMTP reused between sends to skip the DNS + TCP +
+# STARTTLS + AUTH handshake on every alert.
+_smtp = None
+
+
+def _connect() -> smtplib.SMTP:
+    """(Re)establish the persistent SMTP connection and authenticate."""
+    global _smtp
+    cfg = get_smtp_config()
+    smtp = smtplib.SMTP(cfg.host, cfg.port, timeout=30)
+    if cfg.use_tls:
+        smtp.starttls()
+    smtp.login(cfg.user, cfg.password)
+    _smtp = smtp
+    return smtp
+
+
+def _deliver(message: EmailMessage):
+    """Send a message over the persistent connection, reconnecting once if it dropped."""
+    global _smtp
+    smtp = _smtp if _smtp is not None else _connect()
+    try:
+        smtp.send_message(message)
+    except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError):
+        _smtp = None
+        _connect().send_message(message)
+
+
+# Celery app (must exist at import time so tasks register with the worker)
+app = Celery('alerts', broker='redis://localhost:6379/0')
+
+
+@worker_process_init.connect
+def _init_smtp_connection(**kwargs):
+    """Pre-warm the persistent SMTP connection when a worker process starts."""
+    try:
+        _connect()
+    except Exception as e:
+        # First send_alert_email will reconnect on demand
+        logging.warning(f"Could not pre-warm SMTP connection: {e}")
+
+
+@app.task
+def send_alert_email(subject, body):
+    try:
+        logging.info(f"Attempting to send alert email: {subject}")
+        cfg = get_smtp_config()
+
+        # deepcopy: a shallow copy would share the template's header list
+        message = copy.deepcopy(_message_template(cfg))
+        message["Subject"] = subject
+        message.set_content(body)
+
+        _deliver(message)
+        logging.info("Alert email sent successfully.")
+    except Exception as e:
+        logging.error(f"Failed to send alert email: {e}", exc_info=True)